@@ -1,51 +1,216 @@
 import streamlit as st
-import openapi_client
-from openapi_client.models import ChessCreate, ChessParties, Party, PieceType, PieceColor
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from openapi_client import ApiClient, Configuration, DefaultApi
+from openapi_client.exceptions import ApiException
+from openapi_client.models import (
+    ChessCreate, ChessParties, ChessMakeBlackMoveCommand, ChessMakeWhiteMoveCommand,
+    Move, Party, PieceColor, PieceType, Position
+)
 import requests
-from typing import Dict, List, Callable
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Callable, Tuple
 from dataclasses import dataclass
 import functools
+import logging
+import io
+import hashlib
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pytz
 
-@dataclass
+log = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+@dataclass(slots=True, frozen=True)
 class AuthConfig:
     auth_url: str = "https://keycloak-platformdemo-chess.noumena.cloud/realms/noumena"
     client_id: str = "noumena"
     client_secret: str = "test"
 
+# Shared by all ChessApp instances within a script run
+_AUTH = AuthConfig()
+
+@st.cache_resource
+def _kc_session() -> requests.Session:
+    """Shared session for Keycloak token requests so connections are kept alive between refreshes.
+
+    Streamlit re-executes this script on every rerun, so process-wide objects live in
+    st.cache_resource rather than in plain module globals.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=10,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=["POST"])
+    ))
+    return session
+
+# (connect, read) timeout in seconds for Keycloak token requests
+KC_TIMEOUT = (3, 5)
+
+@st.cache_resource
+def _api_pool() -> ThreadPoolExecutor:
+    """Worker pool for firing independent backend reads concurrently."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="chess-api")
+
+# How long the games list is served from cache before it is fetched again
+GAMES_CACHE_TTL = 15
+
+@st.cache_data(ttl=GAMES_CACHE_TTL, show_spinner=False)
+def _fetch_games(token_fingerprint: str, _api_instance) -> List[Dict]:
+    """Fetch the games list, cached per access token so sessions never share results."""
+    return _api_instance.get_chess_list().items
+
+def _token_fingerprint(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+# Chess notation lookups: file letter (either case) to x, rank digit to y
+_FILE_IDX = {**{c: i for i, c in enumerate('abcdefgh')}, **{c: i for i, c in enumerate('ABCDEFGH')}}
+_RANK_IDX = {str(i + 1): i for i in range(8)}
+
+# Refresh the access token this many seconds before it actually expires
+TOKEN_EXPIRY_MARGIN = 30
+
+# Background refresh kicks in this many seconds before the access token expires
+BACKGROUND_REFRESH_AHEAD = 60
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+def _session_alive(session_id: str) -> bool:
+    try:
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+class _RefreshScheduler(threading.Thread):
+    """Refreshes a session's tokens shortly before they expire, off the script thread.
+
+    Streamlit's session_state is only usable from the script thread, so the latest
+    token response is kept on the scheduler and picked up by ensure_valid_token.
+    The scheduler stops after a refresh that no rerun has adopted, so an idle tab
+    doesn't keep the Keycloak session alive past the realm's SSO idle timeout.
+    """
+
+    def __init__(self, app: "ChessApp", session_id: str, token_data: Dict[str, str]):
+        super().__init__(daemon=True, name=f"token-refresh-{session_id}")
+        self.app = app
+        self.schedulers, self.lock = _refresh_registry()
+        self.session_id = session_id
+        self.token_data = token_data
+        self.token_exp = token_data["_expires_at"]
+        # Set by ensure_valid_token on each rerun; cleared after every background refresh
+        self.adopted = True
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while True:
+            # Short-lived tokens are refreshed halfway through instead of right away
+            remaining = self.token_exp - time.time()
+            delay = max(remaining - BACKGROUND_REFRESH_AHEAD, remaining / 2, 1)
+            if self._stopped.wait(delay) or not _session_alive(self.session_id):
+                break
+            with self.lock:
+                if not self.adopted:
+                    # The user has been idle since the last refresh; stay registered so a
+                    # returning rerun can still pick up that token, and let the inline
+                    # refresh take over from there
+                    return
+            try:
+                token_data = self.app.refresh_token(self.token_data["refresh_token"])
+            except ValueError:
+                # Leave it to the inline refresh on the next request
+                break
+            with self.lock:
+                if self._stopped.is_set():
+                    break
+                self.token_data = token_data
+                self.token_exp = token_data["_expires_at"]
+                self.adopted = False
+        with self.lock:
+            if self.schedulers.get(self.session_id) is self:
+                del self.schedulers[self.session_id]
+
+@st.cache_resource
+def _refresh_registry() -> Tuple[Dict[str, _RefreshScheduler], threading.Lock]:
+    """Background refresh threads keyed by Streamlit session id, and the lock guarding them."""
+    return {}, threading.Lock()
+
+def _start_token_refresh(app: "ChessApp", token_data: Dict[str, str]):
+    session_id = _session_id()
+    scheduler = _RefreshScheduler(app, session_id, token_data)
+    with scheduler.lock:
+        # Forget idle-stopped schedulers whose sessions have since closed
+        for stale_id, stale in list(scheduler.schedulers.items()):
+            if not stale.is_alive() and not _session_alive(stale_id):
+                del scheduler.schedulers[stale_id]
+        previous = scheduler.schedulers.get(session_id)
+        if previous:
+            previous.stop()
+        scheduler.schedulers[session_id] = scheduler
+    scheduler.start()
+
+def _stop_token_refresh():
+    schedulers, lock = _refresh_registry()
+    with lock:
+        scheduler = schedulers.pop(_session_id(), None)
+        if scheduler:
+            scheduler.stop()
+
+def _logout():
+    """End the session: stop its background refresh, drop all state and rerun to the login form."""
+    _stop_token_refresh()
+    st.session_state.clear()
+    st.rerun()
+
 def with_token_refresh(func: Callable):
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
         try:
             return func(self, *args, **kwargs)
-        except Exception as e:
-            if "token" in str(e).lower() or "unauthorized" in str(e).lower():
-                try:
-                    self.ensure_valid_token()
-                    return func(self, *args, **kwargs)
-                except ValueError as ve:
-                    st.error(str(ve))
-                    st.session_state.clear()
-                    st.rerun()
-            raise e
+        except ApiException as e:
+            if e.status != 401:
+                raise
+        try:
+            self.ensure_valid_token(force=True)
+        except ValueError as ve:
+            st.error(str(ve))
+            _logout()
+        # Errors from the retried call reach the caller unchanged
+        return func(self, *args, **kwargs)
     return wrapper
 
 class ChessApp:
     def __init__(self):
         self.api_client = None
-        self.configuration = openapi_client.Configuration(
+        self.configuration = Configuration(
             host="https://engine-platformdemo-chess.noumena.cloud"
         )
-        self.auth_config = AuthConfig()
+        self.auth_config = _AUTH
+        self.kc_session = _kc_session()
 
     def fetch_access_token(self, username: str, password: str) -> Dict[str, str]:
-        url = f"{self.auth_config.auth_url}/protocol/openid-connect/token"
+        auth = self.auth_config
+        url = f"{auth.auth_url}/protocol/openid-connect/token"
 
         data = {
             "grant_type": "password",
-            "client_id": self.auth_config.client_id,
-            "client_secret": self.auth_config.client_secret,
+            "client_id": auth.client_id,
+            "client_secret": auth.client_secret,
             "username": username,
             "password": password
         }
@@ -55,25 +220,27 @@ class ChessApp:
         }
 
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = self.kc_session.post(url, headers=headers, data=data, timeout=KC_TIMEOUT)
             response.raise_for_status()
-            token_data = response.json()
+            token_data = _loads(response.content)
             
             if "access_token" not in token_data or "refresh_token" not in token_data:
                 raise ValueError(f"Invalid token response: {token_data}")
                 
+            token_data["_expires_at"] = time.time() + int(token_data.get("expires_in", 60))
             return token_data
             
         except Exception as e:
             raise ValueError(f"Failed to fetch access token: {str(e)}")
 
     def refresh_token(self, refresh_token: str) -> Dict[str, str]:
-        url = f"{self.auth_config.auth_url}/protocol/openid-connect/token"
+        auth = self.auth_config
+        url = f"{auth.auth_url}/protocol/openid-connect/token"
 
         data = {
             "grant_type": "refresh_token",
-            "client_id": self.auth_config.client_id,
-            "client_secret": self.auth_config.client_secret,
+            "client_id": auth.client_id,
+            "client_secret": auth.client_secret,
             "refresh_token": refresh_token
         }
 
@@ -82,41 +249,65 @@ class ChessApp:
         }
 
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = self.kc_session.post(url, headers=headers, data=data, timeout=KC_TIMEOUT)
             response.raise_for_status()
-            token_data = response.json()
+            token_data = _loads(response.content)
             
             if "access_token" not in token_data or "refresh_token" not in token_data:
                 raise ValueError(f"Invalid token response: {token_data}")
                 
+            token_data["_expires_at"] = time.time() + int(token_data.get("expires_in", 60))
             return token_data
         except Exception as e:
             raise ValueError(f"Failed to refresh token: {str(e)}")
 
-    def ensure_valid_token(self):
+    def ensure_valid_token(self, force: bool = False):
+        # Pick up a token the background scheduler has already refreshed
+        schedulers, lock = _refresh_registry()
+        with lock:
+            scheduler = schedulers.get(_session_id())
+            if scheduler:
+                scheduler.adopted = True
+                if scheduler.token_exp > st.session_state.get('token_exp', 0):
+                    self._store_tokens(scheduler.token_data)
+
+        # Skip the refresh round-trip while the current token is still comfortably valid
+        if (not force and st.session_state.get('api_client')
+                and time.time() < st.session_state.get('token_exp', 0) - TOKEN_EXPIRY_MARGIN):
+            return
+
         if not st.session_state.get('refresh_token'):
             raise ValueError("No refresh token available. Please login again.")
             
         try:
             token_data = self.refresh_token(st.session_state.refresh_token)
-            self.configuration.access_token = token_data["access_token"]
-            self.api_client = openapi_client.ApiClient(self.configuration)
-            st.session_state.api_client = self.api_client
-            st.session_state.auth_token = token_data["access_token"]
-            st.session_state.refresh_token = token_data["refresh_token"]
+            self._store_tokens(token_data)
+            _start_token_refresh(self, token_data)
         except Exception as e:
             raise ValueError("Session expired. Please login again.")
 
+    def _store_tokens(self, token_data: Dict[str, str]):
+        self.api_client = st.session_state.get('api_client')
+        if self.api_client is None:
+            self.configuration.access_token = token_data["access_token"]
+            self.api_client = ApiClient(self.configuration)
+            st.session_state.api_client = self.api_client
+            st.session_state.api_default = DefaultApi(self.api_client)
+        else:
+            # Swap the token in place so the client keeps its pooled connections
+            self.configuration = self.api_client.configuration
+            self.configuration.access_token = token_data["access_token"]
+        st.session_state.auth_token = token_data["access_token"]
+        st.session_state.refresh_token = token_data["refresh_token"]
+        st.session_state.token_exp = token_data["_expires_at"]
+
     @with_token_refresh
     def create_chess_instance(self, player_username: str, opponent_username: str, player_color: str) -> None:
         if not st.session_state.get('api_client'):
             raise ValueError("Please login first")
 
-        # Use API client from session state
-        api_client = st.session_state.api_client
-        
         # Debug log the input
-        print(f"\nCreating game with: player={player_username}, opponent={opponent_username}, color={player_color}")
+        log.debug("Creating game with: player=%s, opponent=%s, color=%s", player_username, opponent_username, player_color)
         
         # Create parties based on color selection - normalize color to uppercase
         is_white = player_color.upper() == "WHITE"
@@ -124,8 +315,8 @@ class ChessApp:
         black_party = self._username_to_party(opponent_username if is_white else player_username)
         
         # Debug log the parties
-        print(f"White party: {white_party.entity}")
-        print(f"Black party: {black_party.entity}")
+        log.debug("White party: %s", white_party.entity)
+        log.debug("Black party: %s", black_party.entity)
         
         parties = ChessParties(
             white=white_party,
@@ -135,26 +326,26 @@ class ChessApp:
         chess_create = ChessCreate(parties=parties)
         
         # Create chess instance
-        api_instance = openapi_client.DefaultApi(api_client)
+        api_instance = st.session_state.api_default
         response = api_instance.create_chess(chess_create)
         
         # Debug log the created game
-        print(f"Created game: {response.id}")
-        print(f"Game state: {response.state}")
-        print(f"Game parties: white={response.parties.white.entity}, black={response.parties.black.entity}\n")
+        log.debug("Created game: %s", response.id)
+        log.debug("Game state: %s", response.state)
+        log.debug("Game parties: white=%s, black=%s", response.parties.white.entity, response.parties.black.entity)
+        
+        # The cached games list no longer includes the new game
+        _fetch_games.clear()
         
         return response
 
     def login(self, username: str, password: str) -> None:
         try:
             token_data = self.fetch_access_token(username, password)
-            self.configuration.access_token = token_data["access_token"]
-            self.api_client = openapi_client.ApiClient(self.configuration)
-            st.session_state.api_client = self.api_client
+            self._store_tokens(token_data)
+            _start_token_refresh(self, token_data)
             st.session_state.username = username
             st.session_state.stored_username = username  # Store username for session restoration
-            st.session_state.auth_token = token_data["access_token"]
-            st.session_state.refresh_token = token_data["refresh_token"]
             
             st.success("Successfully logged in!")
             st.rerun()
@@ -166,56 +357,47 @@ class ChessApp:
         if not st.session_state.get('api_client'):
             raise ValueError("Please login first")
 
-        api_instance = openapi_client.DefaultApi(st.session_state.api_client)
-        response = api_instance.get_chess_list()
-        return response.items
-
-    @with_token_refresh
-    def get_board(self, game_id: str) -> List[Dict]:
-        if not st.session_state.get('api_client'):
-            raise ValueError("Please login first")
-
-        api_instance = openapi_client.DefaultApi(st.session_state.api_client)
-        return api_instance.chess_get_board(game_id)
-
-    @with_token_refresh
-    def get_current_turn(self, game_id: str) -> str:
-        if not st.session_state.get('api_client'):
-            raise ValueError("Please login first")
-
-        api_instance = openapi_client.DefaultApi(st.session_state.api_client)
-        return api_instance.chess_get_current_turn(game_id)
+        return _fetch_games(_token_fingerprint(st.session_state.auth_token), st.session_state.api_default)
 
     @with_token_refresh
     def make_move(self, game_id: str, from_pos: str, to_pos: str, current_turn: str) -> None:
+        # Convert chess notation to internal coordinates; lookups yield None for invalid squares
+        from_x = _FILE_IDX.get(from_pos[:1])
+        from_y = _RANK_IDX.get(from_pos[1:])
+        to_x = _FILE_IDX.get(to_pos[:1])
+        to_y = _RANK_IDX.get(to_pos[1:])
+        if from_x is None or from_y is None or to_x is None or to_y is None:
+            st.error("Squares must be in format like 'e2'")
+            raise ValueError("Move failed")
+
         try:
             if not st.session_state.get('api_client'):
                 raise ValueError("Please login first")
 
-            # Convert chess notation to internal coordinates
-            from_x = ord(from_pos[0].lower()) - ord('a')
-            from_y = int(from_pos[1]) - 1
-            to_x = ord(to_pos[0].lower()) - ord('a')
-            to_y = int(to_pos[1]) - 1
-
-            print(f"Debug - Move from: {from_pos} ({from_x}, {from_y})")
-            print(f"Debug - Move to: {to_pos} ({to_x}, {to_y})")
+            log.debug("Move from: %s (%s, %s)", from_pos, from_x, from_y)
+            log.debug("Move to: %s (%s, %s)", to_pos, to_x, to_y)
 
             # Create proper Position and Move objects
-            from_position = openapi_client.models.Position(x=from_x, y=from_y)
-            to_position = openapi_client.models.Position(x=to_x, y=to_y)
-            move = openapi_client.models.Move(var_from=from_position, to=to_position)
+            from_position = Position(x=from_x, y=from_y)
+            to_position = Position(x=to_x, y=to_y)
+            move = Move(var_from=from_position, to=to_position)
 
-            api_instance = openapi_client.DefaultApi(st.session_state.api_client)
+            api_instance = st.session_state.api_default
             
             if current_turn == PieceColor.WHITE:
-                command = openapi_client.models.ChessMakeWhiteMoveCommand(move=move)
+                command = ChessMakeWhiteMoveCommand(move=move)
                 api_instance.chess_make_white_move(game_id, command)
             else:
-                command = openapi_client.models.ChessMakeBlackMoveCommand(move=move)
+                command = ChessMakeBlackMoveCommand(move=move)
                 api_instance.chess_make_black_move(game_id, command)
 
+            # Game states shown in the games list may have changed
+            _fetch_games.clear()
+
         except Exception as e:
+            # Let with_token_refresh retry after refreshing an expired token
+            if isinstance(e, ApiException) and e.status == 401:
+                raise
             # Extract the meaningful part of the error message
             error_msg = str(e)
             if "Invalid move" in error_msg:
@@ -227,12 +409,46 @@ class ChessApp:
             raise ValueError("Move failed")  # Simplified error for the caller
 
     @with_token_refresh
-    def get_game(self, game_id: str):
+    def get_game_bundle(self, game_id: str, with_game: bool = True):
+        """Fetch the game, its board and the current turn concurrently."""
         if not st.session_state.get('api_client'):
             raise ValueError("Please login first")
 
-        api_instance = openapi_client.DefaultApi(st.session_state.api_client)
-        return api_instance.get_chess_by_id(game_id)
+        # Worker threads can't read session_state, so hand them the API instance directly
+        api_instance = st.session_state.api_default
+        pool = _api_pool()
+        game = pool.submit(api_instance.get_chess_by_id, game_id) if with_game else None
+        board = pool.submit(api_instance.chess_get_board, game_id)
+        current_turn = pool.submit(api_instance.chess_get_current_turn, game_id)
+        return game.result() if game else None, board.result(), current_turn.result()
+
+    def get_game_full(self, game_id: str, with_game: bool = True):
+        """Fetch the game, its board and the current turn, using getGameView when the backend has it.
+
+        Pass with_game=False to skip fetching the game itself; None is returned in its place.
+        """
+        if st.session_state.get('game_view_supported', True) and hasattr(DefaultApi, "chess_get_game_view"):
+            try:
+                return self._get_game_and_view(game_id, with_game)
+            except ApiException as e:
+                if e.status not in (404, 405):
+                    raise
+            # The engine runs a Chess protocol without getGameView; stop probing it for this session
+            # once the fallback succeeds (a 404 for an unknown game fails both ways)
+            result = self.get_game_bundle(game_id, with_game)
+            st.session_state.game_view_supported = False
+            return result
+        return self.get_game_bundle(game_id, with_game)
+
+    @with_token_refresh
+    def _get_game_and_view(self, game_id: str, with_game: bool = True):
+        if not st.session_state.get('api_client'):
+            raise ValueError("Please login first")
+
+        api_instance = st.session_state.api_default
+        game = _api_pool().submit(api_instance.get_chess_by_id, game_id) if with_game else None
+        view = api_instance.chess_get_game_view(game_id)
+        return game.result() if game else None, view.board, view.current_turn
 
     def _create_party(self, claims: Dict[str, List[str]]) -> Party:
         return Party(
@@ -246,119 +462,137 @@ class ChessApp:
             "iss": [self.auth_config.auth_url]
         })
 
-def display_board(pieces, is_white: bool = True):
-    """Display the chess board using Unicode chess pieces."""
-    # Create empty board
-    board = [[None for _ in range(8)] for _ in range(8)]
-    
-    # Detect theme
-    is_dark_mode = st.get_option("theme.base") == "dark"
-    
-    # CSS for the chessboard
-    st.markdown("""
-        <style>
-        .chess-board {
-            font-family: monospace;
-            font-size: 24px;
-            line-height: 1.2;
-            white-space: pre;
-            background-color: #2c2c2c;
-            display: inline-block;
-            padding: 10px;
-            border-radius: 5px;
-        }
-        .square-light {
-            background-color: #f0d9b5;
-            padding: 5px 10px;
-            display: inline-block;
-            width: 40px;
-            height: 40px;
-            text-align: center;
-            vertical-align: middle;
-        }
-        .square-dark {
-            background-color: #b58863;
-            padding: 5px 10px;
-            display: inline-block;
-            width: 40px;
-            height: 40px;
-            text-align: center;
-            vertical-align: middle;
-        }
-        .piece-white {
-            color: rgba(255, 255, 255, 0.95);
-            text-shadow: 0 0 2px rgba(0, 0, 0, 0.4);
-        }
-        .piece-black {
-            color: rgba(0, 0, 0, 0.95);
-            text-shadow: 0 0 2px rgba(255, 255, 255, 0.4);
-        }
-        .coordinate {
-            color: #f0f0f0;
-            display: inline-block;
-            width: 40px;
-            height: 40px;
-            text-align: center;
-            line-height: 50px;
-            vertical-align: middle;
-        }
-        .coordinate-row {
-            color: #f0f0f0;
-            width: 20px;
-            padding: 0 10px;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
-    # Define single set of piece symbols
-    pieces_unicode = {
-        PieceType.PAWN: "♟",
-        PieceType.ROOK: "♜",
-        PieceType.KNIGHT: "♞",
-        PieceType.BISHOP: "♝",
-        PieceType.QUEEN: "♛",
-        PieceType.KING: "♚"
-    }
-    
+# CSS for the chessboard, emitted together with the board markup
+_BOARD_CSS = """<style>
+.chess-board {
+    font-family: monospace;
+    font-size: 24px;
+    line-height: 1.2;
+    white-space: pre;
+    background-color: #2c2c2c;
+    display: inline-block;
+    padding: 10px;
+    border-radius: 5px;
+}
+.square-light {
+    background-color: #f0d9b5;
+    padding: 5px 10px;
+    display: inline-block;
+    width: 40px;
+    height: 40px;
+    text-align: center;
+    vertical-align: middle;
+}
+.square-dark {
+    background-color: #b58863;
+    padding: 5px 10px;
+    display: inline-block;
+    width: 40px;
+    height: 40px;
+    text-align: center;
+    vertical-align: middle;
+}
+.piece-white {
+    color: rgba(255, 255, 255, 0.95);
+    text-shadow: 0 0 2px rgba(0, 0, 0, 0.4);
+}
+.piece-black {
+    color: rgba(0, 0, 0, 0.95);
+    text-shadow: 0 0 2px rgba(255, 255, 255, 0.4);
+}
+.coordinate {
+    color: #f0f0f0;
+    display: inline-block;
+    width: 40px;
+    height: 40px;
+    text-align: center;
+    line-height: 50px;
+    vertical-align: middle;
+}
+.coordinate-row {
+    color: #f0f0f0;
+    width: 20px;
+    padding: 0 10px;
+}
+</style>
+"""
+
+# Column coordinates shown above and below the board
+_COL_HEADER = (
+    '<div><span class="coordinate-row"> </span>'
+    + ''.join(f'<span class="coordinate">{col}</span>' for col in 'abcdefgh')
+    + '<span class="coordinate-row"> </span></div>'
+)
+
+# Define single set of piece symbols
+_PIECES_UNICODE = {
+    PieceType.PAWN: "♟",
+    PieceType.ROOK: "♜",
+    PieceType.KNIGHT: "♞",
+    PieceType.BISHOP: "♝",
+    PieceType.QUEEN: "♛",
+    PieceType.KING: "♚"
+}
+
+# Precomputed square markup: the prefix is picked by square shade ((row + col) & 1 is light),
+# the suffix by the occupying piece
+_SQ_PREFIX = ('<span class="square-dark', '<span class="square-light')
+_EMPTY_SUFFIX = '"> </span>'
+_PIECE_SUFFIX = {
+    (color, piece_type): f'{" piece-white" if color == PieceColor.WHITE else " piece-black"}">{symbol}</span>'
+    for color in PieceColor
+    for piece_type, symbol in _PIECES_UNICODE.items()
+}
+# Square prefix for each of the 64 flat board indices
+_SQUARE_PREFIX = tuple(_SQ_PREFIX[((idx >> 3) + (idx & 7)) & 1] for idx in range(64))
+_ROW_OPEN = tuple(f'<div><span class="coordinate-row">{8-i}</span>' for i in range(8))
+_ROW_CLOSE = tuple(f'<span class="coordinate-row">{8-i}</span></div>' for i in range(8))
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _render_board_html(state: tuple) -> str:
+    """Build the board HTML for a (x, y, color, type) piece-state tuple."""
+    # Create empty board as a flat list of 64 square suffixes, indexed row * 8 + col
+    board = [_EMPTY_SUFFIX] * 64
+    piece_suffix = _PIECE_SUFFIX
+
     # Place pieces on board
-    for piece in pieces:
-        y = 7 - piece.position.y  # Flip y since we display rank 1 at the bottom
-        x = piece.position.x      # x is already correct (a=0, h=7)
-        board[y][x] = piece
-    
-    # Generate HTML for the board
-    html = ['<div class="chess-board">']
+    for x, y, color, piece_type in state:
+        # Flip y since we display rank 1 at the bottom; x is already correct (a=0, h=7)
+        board[(7 - y) * 8 + x] = piece_suffix[(color, piece_type)]
     
-    # Add column coordinates at the top
-    html.append('<div><span class="coordinate-row"> </span>')
-    for col in 'abcdefgh':
-        html.append(f'<span class="coordinate">{col}</span>')
-    html.append('<span class="coordinate-row"> </span></div>')
+    # Generate HTML for the board into a single buffer
+    buf = io.StringIO()
+    write = buf.write
+    write(_BOARD_CSS)
+    write('<div class="chess-board">')
+    write(_COL_HEADER)
     
     # Add rows with row coordinates
-    for i, row in enumerate(board):
-        html.append(f'<div><span class="coordinate-row">{8-i}</span>')
-        for j, piece in enumerate(row):
-            is_light = (i + j) % 2 == 1
-            square_class = "square-light" if is_light else "square-dark"
-            piece_class = ""
-            symbol = " "
-            if piece is not None:
-                piece_class = " piece-white" if piece.color == PieceColor.WHITE else " piece-black"
-                symbol = pieces_unicode[piece.type]
-            html.append(f'<span class="{square_class}{piece_class}">{symbol}</span>')
-        html.append(f'<span class="coordinate-row">{8-i}</span></div>')
+    for idx, suffix in enumerate(board):
+        j = idx & 7
+        if j == 0:
+            write(_ROW_OPEN[idx >> 3])
+        write(_SQUARE_PREFIX[idx])
+        write(suffix)
+        if j == 7:
+            write(_ROW_CLOSE[idx >> 3])
     
     # Add column coordinates at the bottom
-    html.append('<div><span class="coordinate-row"> </span>')
-    for col in 'abcdefgh':
-        html.append(f'<span class="coordinate">{col}</span>')
-    html.append('<span class="coordinate-row"> </span></div>')
+    write(_COL_HEADER)
     
-    html.append('</div>')
+    write('</div>')
+    return buf.getvalue()
+
+def display_board(pieces, is_white: bool = True):
+    """Display the chess board using Unicode chess pieces."""
+    # Detect theme
+    is_dark_mode = st.get_option("theme.base") == "dark"
+
+    # Reruns that don't change the position reuse the cached HTML
+    state = tuple((p.position.x, p.position.y, p.color, p.type) for p in pieces)
     
     # Display the board
-    st.markdown(''.join(html), unsafe_allow_html=True)
+    st.markdown(_render_board_html(state), unsafe_allow_html=True)
 
 def format_game_date(game) -> tuple[float, str]:
     """Format the game's creation date for display and sorting."""
@@ -412,7 +646,7 @@ def format_game_date(game) -> tuple[float, str]:
         
         return dt.timestamp(), formatted
     except Exception as e:
-        print(f"Error parsing date: {e}")  # Debug log
+        log.debug("Error parsing date: %s", e)
         return 0, "Unknown"
 
 def format_game_state(state: str) -> str:
@@ -430,10 +664,14 @@ def main():
         st.session_state.stored_username = None
     if 'api_client' not in st.session_state:
         st.session_state.api_client = None
+    if 'api_default' not in st.session_state:
+        st.session_state.api_default = None
     if 'auth_token' not in st.session_state:
         st.session_state.auth_token = None
     if 'refresh_token' not in st.session_state:
         st.session_state.refresh_token = None
+    if 'token_exp' not in st.session_state:
+        st.session_state.token_exp = 0
     if 'show_create_form' not in st.session_state:
         st.session_state.show_create_form = False
     if 'active_game_id' not in st.session_state:
@@ -448,8 +686,13 @@ def main():
             # If token refresh successful, set username from stored token
             st.session_state.username = st.session_state.get('stored_username')
         except ValueError:
-            st.session_state.clear()
-            st.rerun()
+            _logout()
+    elif st.session_state.username:
+        # Refresh ahead of expiry; this is a no-op while the cached token is still valid
+        try:
+            app.ensure_valid_token()
+        except ValueError:
+            _logout()
 
     # Login section
     if not st.session_state.username:
@@ -474,16 +717,23 @@ def main():
             st.write(f"Logged in as: {st.session_state.username}")
         with col3:
             if st.button("Logout"):
-                st.session_state.clear()
-                st.rerun()
+                _logout()
 
         # Main content
         if st.session_state.active_game_id:
             try:
-                # Get game details first to show opponent in header
-                game = app.get_game(st.session_state.active_game_id)
-                is_white = st.session_state.username == game.parties.white.entity.get("preferred_username")[0]
-                opponent_username = game.parties.black.entity.get("preferred_username")[0] if is_white else game.parties.white.entity.get("preferred_username")[0]
+                # Parties never change during a game, so the player's role is only worked out once
+                role_key = f"role:{st.session_state.active_game_id}"
+                role = st.session_state.get(role_key)
+
+                # Get game details (unless the role is cached), board and turn in one concurrent round-trip
+                game, board, current_turn = app.get_game_full(st.session_state.active_game_id, with_game=role is None)
+                if role is None:
+                    is_white = st.session_state.username == game.parties.white.entity.get("preferred_username")[0]
+                    opponent_username = game.parties.black.entity.get("preferred_username")[0] if is_white else game.parties.white.entity.get("preferred_username")[0]
+                    player_color = PieceColor.WHITE if is_white else PieceColor.BLACK
+                    role = st.session_state[role_key] = (is_white, player_color, opponent_username)
+                is_white, player_color, opponent_username = role
                 
                 # Show game header with opponent
                 st.header(f"Game vs {opponent_username}")
@@ -494,13 +744,6 @@ def main():
                     st.session_state.active_game_id = None
                     st.rerun()
 
-                # Get remaining game state
-                board = app.get_board(st.session_state.active_game_id)
-                current_turn = app.get_current_turn(st.session_state.active_game_id)
-                
-                # Get player's color in this game
-                player_color = PieceColor.WHITE if is_white else PieceColor.BLACK
-                
                 # Display game state
                 st.subheader("Game Status")
                 if current_turn == player_color:
@@ -574,7 +817,7 @@ def main():
             with st.form("create_game_form"):
                 opponent_username = st.text_input("Opponent's username")
                 player_color = st.selectbox("Select your color", ["White", "Black"])
-                print(f"Debug - Selected color: {player_color}")  # Debug the selected color
+                log.debug("Selected color: %s", player_color)
                 
                 submit = st.form_submit_button("Create Game")
                 if submit: